@@ -0,0 +1,84 @@
+"""Read latency under concurrent load: primary vs secondary reads, by pool size.
+
+Needs a local replica set, e.g.
+    mongod --replSet rs0 ... (x3) && mongosh --eval "rs.initiate(...)"
+
+Usage: python bench_mongo.py [--uri URI] [--concurrency N] [--requests N] [--pool-sizes 10,50,100]
+"""
+import argparse
+import asyncio
+import time
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.read_preferences import Primary, SecondaryPreferred
+from pymongo.write_concern import WriteConcern
+from config import MONGO_COMPRESSORS
+from pool_metrics import PoolMetrics
+
+USERS = 10000
+
+
+async def seed(client):
+    users = client.bench.get_collection("users", write_concern=WriteConcern(w="majority"))
+    await users.drop()
+    await users.insert_many([
+        {"user_id": i, "wallet_balance": i % 500, "banned": False} for i in range(USERS)
+    ])
+    await users.create_index("user_id")
+
+
+async def run(uri, pool_size, read_preference, concurrency, requests):
+    metrics = PoolMetrics(pool_size)
+    client = AsyncIOMotorClient(
+        uri, maxPoolSize=pool_size, compressors=MONGO_COMPRESSORS, event_listeners=[metrics]
+    )
+    users = client.bench.get_collection("users", read_preference=read_preference)
+    await users.find_one({})  # Warm up server selection
+
+    latencies = []
+    per_worker = requests // concurrency
+
+    async def worker(offset):
+        for i in range(per_worker):
+            started = time.perf_counter()
+            await users.find_one({"user_id": (offset * per_worker + i) % USERS})
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stats = metrics.stats()
+    client.close()
+
+    latencies.sort()
+
+    def percentile(q):
+        return latencies[min(int(len(latencies) * q), len(latencies) - 1)] * 1000
+
+    return len(latencies) / elapsed, percentile(0.5), percentile(0.95), percentile(0.99), stats
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uri", default="mongodb://localhost:27017,localhost:27018,localhost:27019/?replicaSet=rs0")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--pool-sizes", default="10,50,100")
+    args = parser.parse_args()
+
+    seed_client = AsyncIOMotorClient(args.uri)
+    await seed(seed_client)
+    seed_client.close()
+
+    print(f"{'pool':>5} {'reads':>10} {'ops/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'peak use':>9} {'peak wait':>10} {'timeouts':>9}")
+    for pool_size in (int(size) for size in args.pool_sizes.split(",")):
+        for label, read_preference in (("primary", Primary()), ("secondary", SecondaryPreferred())):
+            ops, p50, p95, p99, stats = await run(
+                args.uri, pool_size, read_preference, args.concurrency, args.requests
+            )
+            print(f"{pool_size:>5} {label:>10} {ops:>9.0f} {p50:>8.2f} {p95:>8.2f} {p99:>8.2f} "
+                  f"{stats['peak_in_use']:>9} {stats['peak_waiting']:>10} {stats['checkout_timeouts']:>9}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,48 @@
+"""Compare regex-per-handler matching against the packed callback router.
+
+Usage: python bench_router.py [handler counts...]
+
+Action codes are one byte, so counts are capped at 256 handlers.
+"""
+import re
+import sys
+import timeit
+from callbacks import CallbackRouter
+
+# One action code per handler, and codes are a single byte
+MAX_HANDLERS = 256
+
+
+async def _noop(client, callback_query, *args):
+    pass
+
+
+def bench(handlers, number=20000):
+    # What Pyrogram does with one filters.regex per handler: try each in turn
+    patterns = [re.compile(f"^action{i}_") for i in range(handlers)]
+    target = f"action{handlers - 1}_telegram_united_states"
+
+    def regex_dispatch():
+        for pattern in patterns:
+            if pattern.search(target):
+                return target.split("_")
+
+    router = CallbackRouter()
+    for i in range(handlers):
+        router.route(f"action{i}", i, str, str)(_noop)
+    packed = router.pack(f"action{handlers - 1}", "telegram", "united_states")
+
+    regex_time = timeit.timeit(regex_dispatch, number=number)
+    router_time = timeit.timeit(lambda: router.unpack(packed), number=number)
+    return regex_time / number * 1e6, router_time / number * 1e6
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [10, 50, 100, 250]
+    if any(count > MAX_HANDLERS for count in counts):
+        print(f"Action codes are one byte; capping handler counts at {MAX_HANDLERS}")
+        counts = sorted({min(count, MAX_HANDLERS) for count in counts})
+    print(f"{'handlers':>8} {'regex µs':>10} {'router µs':>10} {'speedup':>8}")
+    for count in counts:
+        regex_us, router_us = bench(count)
+        print(f"{count:>8} {regex_us:>10.2f} {router_us:>10.2f} {regex_us / router_us:>7.1f}x")
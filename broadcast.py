@@ -0,0 +1,162 @@
+import asyncio
+import logging
+from datetime import datetime
+from pyrogram.errors import FloodWait, UserIsBlocked, InputUserDeactivated, RPCError
+from config import (
+    BROADCAST_CONCURRENCY, BROADCAST_RATE, BROADCAST_BATCH_SIZE,
+    BROADCAST_MAX_RETRIES, BROADCAST_RETRY_DELAY
+)
+from database import db
+from templates import BROADCAST_PROGRESS_TEXT, BROADCAST_REPORT_TEXT
+
+logger = logging.getLogger(__name__)
+
+# Users that will never receive messages again until they /start the bot.
+# PeerIdInvalid is left out: it usually means the peer isn't in our session
+# storage (e.g. a recreated session file), so it only counts as failed.
+BLOCKED_ERRORS = (UserIsBlocked, InputUserDeactivated)
+
+DELIVERED, BLOCKED, FAILED = "delivered", "blocked", "failed"
+
+
+class Broadcaster:
+    """Sends a message to every reachable user with bounded concurrency.
+
+    Users are streamed in user_id order in batches of BROADCAST_BATCH_SIZE.
+    After each batch the last user_id and counters are saved on the
+    broadcast document, so a crashed run picks up from there on restart
+    and memory stays flat however many users there are.
+    """
+
+    def __init__(self):
+        self.running = {}
+        self._reserved = False
+        self._semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+        self._rate_lock = asyncio.Lock()
+        self._next_slot = 0.0
+
+    def reserve(self):
+        """Claim the broadcast slot; False if one is running or being created"""
+        if self.running or self._reserved:
+            return False
+        self._reserved = True
+        return True
+
+    def release(self):
+        self._reserved = False
+
+    def start(self, client, broadcast):
+        self._reserved = False
+        task = asyncio.create_task(self._run(client, broadcast))
+        self.running[broadcast["_id"]] = task
+        task.add_done_callback(lambda _: self.running.pop(broadcast["_id"], None))
+
+    async def resume(self, client):
+        """Restart broadcasts that were running when the bot stopped"""
+        for broadcast in await db.get_running_broadcasts():
+            logger.info(f"Resuming broadcast {broadcast['_id']} after user {broadcast['last_user_id']}")
+            self.start(client, broadcast)
+
+    async def _wait_turn(self):
+        loop = asyncio.get_running_loop()
+        async with self._rate_lock:
+            slot = max(loop.time(), self._next_slot)
+            self._next_slot = slot + 1 / BROADCAST_RATE
+        await asyncio.sleep(slot - loop.time())
+
+    async def _send(self, client, broadcast, user_id):
+        async with self._semaphore:
+            for _ in range(BROADCAST_MAX_RETRIES):
+                await self._wait_turn()
+                try:
+                    if broadcast["source_message_id"]:
+                        await client.copy_message(
+                            user_id, broadcast["source_chat_id"], broadcast["source_message_id"]
+                        )
+                    else:
+                        await client.send_message(user_id, broadcast["text"])
+                    return DELIVERED
+                except FloodWait as e:
+                    # Hold back every sender, not just this one
+                    loop = asyncio.get_running_loop()
+                    self._next_slot = max(self._next_slot, loop.time() + e.value)
+                except BLOCKED_ERRORS:
+                    return BLOCKED
+                except RPCError as e:
+                    logger.warning(f"Broadcast to {user_id} failed: {e}")
+                    return FAILED
+                except Exception as e:
+                    # Network hiccups and timeouts; try this user again
+                    logger.warning(f"Broadcast to {user_id} errored, retrying: {e}")
+            return FAILED
+
+    async def _send_batch(self, client, broadcast, user_ids):
+        results = await asyncio.gather(*(self._send(client, broadcast, uid) for uid in user_ids))
+        blocked_ids = [uid for uid, result in zip(user_ids, results) if result == BLOCKED]
+        await db.mark_users_blocked(blocked_ids)
+
+        counts = {
+            DELIVERED: results.count(DELIVERED),
+            BLOCKED: len(blocked_ids),
+            FAILED: results.count(FAILED)
+        }
+        await db.save_broadcast_progress(broadcast["_id"], user_ids[-1], **counts)
+        broadcast["last_user_id"] = user_ids[-1]
+        for key, value in counts.items():
+            broadcast[key] += value
+
+    async def _notify(self, client, chat_id, text, message=None):
+        """Send or edit a status message; progress updates are best effort"""
+        try:
+            if message:
+                return await message.edit_text(text)
+            return await client.send_message(chat_id, text)
+        except Exception as e:
+            logger.warning(f"Broadcast status update failed: {e}")
+            return message
+
+    def _progress_text(self, broadcast):
+        return BROADCAST_PROGRESS_TEXT.format(
+            delivered=broadcast[DELIVERED],
+            blocked=broadcast[BLOCKED],
+            failed=broadcast[FAILED]
+        )
+
+    async def _deliver(self, client, broadcast, status):
+        batch = []
+        cursor = db.iter_broadcast_targets(broadcast["last_user_id"], BROADCAST_BATCH_SIZE)
+        async for user in cursor:
+            batch.append(user["user_id"])
+            if len(batch) < BROADCAST_BATCH_SIZE:
+                continue
+            await self._send_batch(client, broadcast, batch)
+            batch = []
+            status = await self._notify(client, broadcast["admin_id"], self._progress_text(broadcast), status)
+        if batch:
+            await self._send_batch(client, broadcast, batch)
+        return await db.finish_broadcast(broadcast["_id"])
+
+    async def _run(self, client, broadcast):
+        status = await self._notify(client, broadcast["admin_id"], self._progress_text(broadcast))
+
+        while True:
+            try:
+                final = await self._deliver(client, broadcast, status)
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Keep this run registered and pick up again from the last checkpoint
+                logger.error(f"❌ Broadcast {broadcast['_id']} interrupted, retrying: {e}")
+                await asyncio.sleep(BROADCAST_RETRY_DELAY)
+
+        await self._notify(client, broadcast["admin_id"], BROADCAST_REPORT_TEXT.format(
+            delivered=final[DELIVERED],
+            blocked=final[BLOCKED],
+            failed=final[FAILED],
+            minutes=(datetime.now() - final["started_at"]).total_seconds() / 60
+        ))
+
+
+# Global broadcaster instance
+broadcaster = Broadcaster()
@@ -0,0 +1,126 @@
+import struct
+import logging
+from bson import ObjectId
+
+logger = logging.getLogger(__name__)
+
+# Telegram rejects callback_data longer than 64 bytes
+MAX_CALLBACK_DATA = 64
+
+# Marks a packed payload. 0xFF never appears in UTF-8, so it can't start
+# the plain action names of older keyboards
+MARKER = 0xFF
+
+_INT = struct.Struct(">q")
+
+
+class CallbackRouter:
+    """Packs callback payloads and routes them to handlers through a dict"""
+
+    def __init__(self):
+        self._by_code = {}
+        self._by_name = {}
+
+    def route(self, name, code, *fields):
+        """Register a handler for `name` under a stable one-byte `code`.
+
+        `fields` are the argument types (str, int or ObjectId) packed into
+        the payload and passed to the handler after the callback query.
+        """
+        if not 0 <= code <= 255:
+            raise ValueError(f"Action code must fit in one byte: {code}")
+        if code in self._by_code or name in self._by_name:
+            raise ValueError(f"Callback action already registered: {name}")
+        for kind in fields:
+            if kind not in (str, int, ObjectId):
+                raise TypeError(f"Unsupported callback field type: {kind!r}")
+
+        def decorator(func):
+            entry = (name, code, fields, func)
+            self._by_code[code] = entry
+            self._by_name[name] = entry
+            return func
+        return decorator
+
+    def pack(self, name, *values):
+        """Build the raw callback_data bytes for `name` with `values`.
+
+        Raises ValueError if the payload doesn't fit in Telegram's limit.
+        """
+        _, code, fields, _ = self._by_name[name]
+        if len(values) != len(fields):
+            raise ValueError(f"{name} takes {len(fields)} field(s), got {len(values)}")
+
+        raw = bytearray((MARKER, code))
+        for kind, value in zip(fields, values):
+            if kind is str:
+                encoded = str(value).encode("utf-8")
+                if len(encoded) > 255:
+                    raise ValueError(f"Callback field too long: {value!r}")
+                raw.append(len(encoded))
+                raw += encoded
+            elif kind is int:
+                raw += _INT.pack(int(value))
+            else:
+                raw += ObjectId(value).binary
+
+        if len(raw) > MAX_CALLBACK_DATA:
+            raise ValueError(f"Callback data for {name} exceeds {MAX_CALLBACK_DATA} bytes")
+        return bytes(raw)
+
+    def unpack(self, data):
+        """Decode callback_data into (handler, args); None if it isn't ours"""
+        # Pyrogram hands over a str whenever the bytes happen to decode as UTF-8
+        raw = data.encode("utf-8") if isinstance(data, str) else data
+
+        if not raw or raw[0] != MARKER:
+            # Keyboards sent before payloads were packed carry the bare name
+            entry = self._by_name.get(raw.decode("utf-8", "ignore"))
+            if entry is None or entry[2]:
+                return None
+            return entry[3], ()
+
+        try:
+            entry = self._by_code.get(raw[1])
+            if entry is None:
+                return None
+
+            args = []
+            offset = 2
+            for kind in entry[2]:
+                if kind is str:
+                    size = raw[offset]
+                    chunk = raw[offset + 1:offset + 1 + size]
+                    if len(chunk) != size:
+                        return None
+                    args.append(chunk.decode("utf-8"))
+                    offset += 1 + size
+                elif kind is int:
+                    args.append(_INT.unpack_from(raw, offset)[0])
+                    offset += _INT.size
+                else:
+                    chunk = raw[offset:offset + 12]
+                    if len(chunk) != 12:
+                        return None
+                    args.append(ObjectId(chunk))
+                    offset += 12
+            if offset != len(raw):
+                return None
+        except (ValueError, IndexError, struct.error):
+            return None
+
+        return entry[3], tuple(args)
+
+    async def dispatch(self, client, callback_query):
+        """Decode the payload once and call the matching handler"""
+        route = self.unpack(callback_query.data)
+        if route is None:
+            logger.warning(f"Unknown callback data: {callback_query.data!r}")
+            await callback_query.answer("❌ This button has expired!", show_alert=True)
+            return
+        handler, args = route
+        await handler(client, callback_query, *args)
+
+
+# Global router instance
+router = CallbackRouter()
@@ -22,3 +22,31 @@ SUPPORT_GROUP = "https://t.me/ZeeMusicSupport"
 
 # Payment Settings
 MIN_RECHARGE = 20
+
+# MongoDB Connection Pool
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "10"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "20000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_WRITE_TIMEOUT_MS = int(os.getenv("MONGO_WRITE_TIMEOUT_MS", "10000"))  # Majority write concern wtimeout
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zstd,zlib")  # First one both sides support wins
+MONGO_STARTUP_RETRY_DELAY = int(os.getenv("MONGO_STARTUP_RETRY_DELAY", "5"))  # Seconds between connect attempts at boot
+MONGO_MAX_STALENESS_SECONDS = int(os.getenv("MONGO_MAX_STALENESS_SECONDS", "90"))  # -1 for no limit, otherwise >= 90
+
+# Inventory Settings
+INVENTORY_POOL_SIZE = 5  # Numbers pre-reserved per hot platform/country
+INVENTORY_REFILL_INTERVAL = 30  # Seconds between background refill/forecast passes
+INVENTORY_RESERVATION_TTL = 600  # Seconds before another process may take over a reservation
+INVENTORY_RATE_WINDOW = 3600  # Seconds of sales used to estimate consumption rate
+LOW_STOCK_ALERT_HOURS = 6  # Alert admins when stock is forecast to run out within this
+LOW_STOCK_ALERT_COOLDOWN = 3600  # Seconds between repeat alerts for the same pair
+
+# Broadcast Settings
+BROADCAST_CONCURRENCY = 20  # Messages in flight at once
+BROADCAST_RATE = 25  # Messages per second; Telegram allows ~30 for bots
+BROADCAST_BATCH_SIZE = 500  # Users sent between progress checkpoints
+BROADCAST_MAX_RETRIES = 3  # Attempts per user after FloodWait or network errors
+BROADCAST_RETRY_DELAY = 30  # Seconds before a broadcast resumes after an unexpected error
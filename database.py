@@ -1,25 +1,79 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
 from datetime import datetime
 import logging
-from config import MONGO_DB_URI, ADMIN_IDS
+from config import (
+    MONGO_DB_URI, ADMIN_IDS,
+    MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_TIME_MS,
+    MONGO_WAIT_QUEUE_TIMEOUT_MS, MONGO_CONNECT_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_WRITE_TIMEOUT_MS, MONGO_COMPRESSORS,
+    MONGO_MAX_STALENESS_SECONDS
+)
 
 logger = logging.getLogger(__name__)
 
 class MongoDB:
     def __init__(self):
         self.client = None
-        self.db = None
+        self.db = None  # Primary reads, default write concern
+        self.secondary_db = None  # Catalog and profile reads, may lag slightly
+        self.majority_db = None  # Money-moving writes
+        self.pool_metrics = None
         
     async def init_db(self):
+        # Imported on first connect rather than when the module loads
+        from motor.motor_asyncio import AsyncIOMotorClient
+        from pymongo.read_preferences import SecondaryPreferred
+        from pymongo.write_concern import WriteConcern
+        from pool_metrics import PoolMetrics
         try:
-            self.client = AsyncIOMotorClient(MONGO_DB_URI)
-            self.db = self.client.SessionBot
+            # Safe to call again after a failed ping; the client is reused
+            if self.client is None:
+                self.pool_metrics = PoolMetrics(MONGO_MAX_POOL_SIZE)
+                self.client = AsyncIOMotorClient(
+                    MONGO_DB_URI,
+                    maxPoolSize=MONGO_MAX_POOL_SIZE,
+                    minPoolSize=MONGO_MIN_POOL_SIZE,
+                    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+                    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                    connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                    socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                    compressors=MONGO_COMPRESSORS,
+                    event_listeners=[self.pool_metrics]
+                )
+                self.db = self.client.SessionBot
+                self.secondary_db = self.client.get_database(
+                    "SessionBot",
+                    read_preference=SecondaryPreferred(max_staleness=MONGO_MAX_STALENESS_SECONDS)
+                )
+                self.majority_db = self.client.get_database(
+                    "SessionBot",
+                    write_concern=WriteConcern(w="majority", wtimeout=MONGO_WRITE_TIMEOUT_MS)
+                )
+            # Open the first connection now instead of on the first query
+            await self.client.admin.command("ping")
             logger.info("✅ Connected to MongoDB successfully!")
             return True
         except Exception as e:
             logger.error(f"❌ Failed to connect to MongoDB: {e}")
             return False
 
+    async def ensure_indexes(self):
+        try:
+            await asyncio.gather(
+                self.db.users.create_index("user_id"),
+                self.db.numbers.create_index([("platform", 1), ("country", 1), ("used", 1)]),
+                self.db.numbers.create_index([("used", 1), ("used_at", 1)]),
+                self.db.numbers.create_index("reserved_by"),
+                self.db.payments.create_index("payment_id"),
+                self.db.payments.create_index("utr"),
+                self.db.admins.create_index("user_id"),
+                self.db.users.create_index([("banned", 1), ("user_id", 1)]),
+                self.db.broadcasts.create_index("status")
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to create MongoDB indexes: {e}")
+
     # User Management
     async def add_user(self, user_id, username, first_name):
         user_data = {
@@ -34,17 +88,26 @@ class MongoDB:
             "joined_date": datetime.now(),
             "total_spent": 0
         }
+        # Coming back to /start means they unblocked the bot
         await self.db.users.update_one(
             {"user_id": user_id},
-            {"$setOnInsert": user_data},
+            {"$setOnInsert": user_data, "$set": {"blocked": False}},
             upsert=True
         )
 
     async def get_user(self, user_id):
         return await self.db.users.find_one({"user_id": user_id})
 
+    async def get_user_profile(self, user_id):
+        """Read-only view of a user; may trail the primary by a few seconds"""
+        user = await self.secondary_db.users.find_one({"user_id": user_id})
+        if user is None:
+            # Just registered and not replicated yet
+            user = await self.get_user(user_id)
+        return user
+
     async def update_wallet(self, user_id, amount):
-        await self.db.users.update_one(
+        await self.majority_db.users.update_one(
             {"user_id": user_id},
             {"$inc": {"wallet_balance": amount}}
         )
@@ -59,29 +122,102 @@ class MongoDB:
             "uploaded_at": datetime.now(),
             "used": False,
             "used_by": None,
-            "used_at": None
+            "used_at": None,
+            "reserved_by": None,
+            "reserved_at": None
         }
         return await self.db.numbers.insert_one(number_data)
 
-    async def get_available_number(self, platform, country):
-        return await self.db.numbers.find_one({
-            "platform": platform,
-            "country": country,
-            "used": False
-        })
+    async def mark_number_used(self, number_id, user_id, owner=None, price=None):
+        """Mark a number sold and return the full document, or None.
 
-    async def mark_number_used(self, number_id, user_id):
-        await self.db.numbers.update_one(
-            {"_id": number_id},
+        With `owner`/`price`, the sale only goes through if the number is
+        still reserved to `owner` and still sells for `price`.
+        """
+        query = {"_id": number_id}
+        if owner is not None:
+            query.update({"used": False, "reserved_by": owner})
+        if price is not None:
+            query["price"] = price
+        return await self.majority_db.numbers.find_one_and_update(
+            query,
             {
                 "$set": {
                     "used": True,
                     "used_by": user_id,
-                    "used_at": datetime.now()
+                    "used_at": datetime.now(),
+                    "reserved_by": None,
+                    "reserved_at": None
                 }
-            }
+            },
+            return_document=True  # ReturnDocument.AFTER
+        )
+
+    # Number Reservations (see inventory.py)
+    # Pools only keep what a purchase needs before the sale, not file_data
+    POOL_FIELDS = {"_id": 1, "platform": 1, "country": 1, "price": 1}
+
+    async def claim_number(self, platform, country, owner):
+        """Atomically reserve one free number for `owner`"""
+        return await self.majority_db.numbers.find_one_and_update(
+            {"platform": platform, "country": country, "used": False, "reserved_by": None},
+            {"$set": {"reserved_by": owner, "reserved_at": datetime.now()}},
+            projection=self.POOL_FIELDS,
+            return_document=True  # ReturnDocument.AFTER
+        )
+
+    async def reserve_numbers(self, platform, country, owner, limit):
+        """Reserve up to `limit` free numbers for `owner` and return them"""
+        free = {"platform": platform, "country": country, "used": False, "reserved_by": None}
+        ids = [doc["_id"] async for doc in self.db.numbers.find(free, {"_id": 1}).limit(limit)]
+        if not ids:
+            return []
+        await self.majority_db.numbers.update_many(
+            {"_id": {"$in": ids}, "used": False, "reserved_by": None},
+            {"$set": {"reserved_by": owner, "reserved_at": datetime.now()}}
+        )
+        # Another process may have won some of them; only keep what is ours
+        cursor = self.db.numbers.find(
+            {"_id": {"$in": ids}, "reserved_by": owner, "used": False}, self.POOL_FIELDS
+        )
+        return await cursor.to_list(length=limit)
+
+    async def release_numbers(self, owner, number_ids=None):
+        query = {"reserved_by": owner, "used": False}
+        if number_ids is not None:
+            query["_id"] = {"$in": list(number_ids)}
+        await self.db.numbers.update_many(
+            query,
+            {"$set": {"reserved_by": None, "reserved_at": None}}
+        )
+
+    async def refresh_reservations(self, owner, number_ids):
+        """Keep `number_ids` reserved; any other reservation of ours expires by TTL"""
+        await self.db.numbers.update_many(
+            {"_id": {"$in": list(number_ids)}, "reserved_by": owner, "used": False},
+            {"$set": {"reserved_at": datetime.now()}}
+        )
+
+    async def release_stale_reservations(self, before):
+        """Free numbers held by processes that stopped refreshing them"""
+        await self.db.numbers.update_many(
+            {"used": False, "reserved_by": {"$ne": None}, "reserved_at": {"$lt": before}},
+            {"$set": {"reserved_by": None, "reserved_at": None}}
+        )
+
+    async def count_available(self, platform, country):
+        return await self.db.numbers.count_documents(
+            {"platform": platform, "country": country, "used": False}
         )
 
+    async def recent_sales(self, since):
+        """(platform, country, used_at) for numbers sold after `since`"""
+        cursor = self.secondary_db.numbers.find(
+            {"used": True, "used_at": {"$gte": since}},
+            {"_id": 0, "platform": 1, "country": 1, "used_at": 1}
+        ).sort("used_at", 1)
+        return [(doc["platform"], doc["country"], doc["used_at"]) async for doc in cursor]
+
     # Payment Management
     async def add_payment(self, user_id, amount, utr, status="pending"):
         payment_data = {
@@ -91,10 +227,10 @@ class MongoDB:
             "status": status,
             "date": datetime.now()
         }
-        return await self.db.payments.insert_one(payment_data)
+        return await self.majority_db.payments.insert_one(payment_data)
 
     async def verify_payment(self, utr):
-        await self.db.payments.update_one(
+        await self.majority_db.payments.update_one(
             {"utr": utr},
             {"$set": {"status": "verified"}}
         )
@@ -109,5 +245,60 @@ class MongoDB:
     async def is_admin(self, user_id):
         return user_id in ADMIN_IDS or await self.is_sudo(user_id)
 
+    # Broadcasts
+    async def create_broadcast(self, admin_id, source_chat_id, source_message_id, text):
+        broadcast_data = {
+            "admin_id": admin_id,
+            "source_chat_id": source_chat_id,
+            "source_message_id": source_message_id,
+            "text": text,
+            "status": "running",
+            "last_user_id": None,
+            "delivered": 0,
+            "blocked": 0,
+            "failed": 0,
+            "started_at": datetime.now(),
+            "finished_at": None
+        }
+        result = await self.db.broadcasts.insert_one(broadcast_data)
+        broadcast_data["_id"] = result.inserted_id
+        return broadcast_data
+
+    async def get_running_broadcasts(self):
+        return await self.db.broadcasts.find({"status": "running"}).to_list(length=None)
+
+    async def save_broadcast_progress(self, broadcast_id, last_user_id, delivered, blocked, failed):
+        await self.db.broadcasts.update_one(
+            {"_id": broadcast_id},
+            {"$set": {"last_user_id": last_user_id},
+             "$inc": {"delivered": delivered, "blocked": blocked, "failed": failed}}
+        )
+
+    async def finish_broadcast(self, broadcast_id):
+        return await self.db.broadcasts.find_one_and_update(
+            {"_id": broadcast_id},
+            {"$set": {"status": "done", "finished_at": datetime.now()}},
+            return_document=True  # ReturnDocument.AFTER
+        )
+
+    def iter_broadcast_targets(self, after_user_id=None, batch_size=1000):
+        """Cursor over reachable user ids in user_id order, starting after a checkpoint"""
+        query = {"banned": False, "blocked": {"$ne": True}}
+        if after_user_id is not None:
+            query["user_id"] = {"$gt": after_user_id}
+        return self.db.users.find(
+            query, {"_id": 0, "user_id": 1}
+        ).sort("user_id", 1).batch_size(batch_size)
+
+    async def mark_users_blocked(self, user_ids):
+        if user_ids:
+            await self.db.users.update_many(
+                {"user_id": {"$in": user_ids}},
+                {"$set": {"blocked": True}}
+            )
+
+    def pool_stats(self):
+        return self.pool_metrics.stats() if self.pool_metrics else {}
+
 # Global database instance
 db = MongoDB()
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from config import (
+    LOG_CHANNEL, INVENTORY_POOL_SIZE, INVENTORY_REFILL_INTERVAL, INVENTORY_RESERVATION_TTL,
+    INVENTORY_RATE_WINDOW, LOW_STOCK_ALERT_HOURS, LOW_STOCK_ALERT_COOLDOWN
+)
+from database import db
+from templates import LOW_STOCK_ALERT_TEXT, OUT_OF_STOCK_ALERT_TEXT
+
+logger = logging.getLogger(__name__)
+
+
+class Inventory:
+    """Serves purchases from small pools of numbers reserved ahead of time.
+
+    Each hot (platform, country) pair keeps up to INVENTORY_POOL_SIZE numbers
+    reserved for this process in Mongo, so a purchase pops one from memory
+    instead of scanning for a free number. Pools are topped up in bulk in the
+    background, which also forecasts when each pair will run out from the
+    recent sales rate and warns the admins in the log channel.
+    """
+
+    def __init__(self):
+        # Unique per process so reservations from a crashed one can be told apart
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.pools = {}
+        self.sales = {}
+        self.last_alert = {}
+        self._refills = {}
+        self._client = None
+        self._task = None
+
+    async def warm_up(self):
+        """Seed sales history from the last window and fill pools for hot pairs"""
+        since = datetime.now() - timedelta(seconds=INVENTORY_RATE_WINDOW)
+        for platform, country, used_at in await db.recent_sales(since):
+            self._sales_window((platform, country)).append(used_at.timestamp())
+        # Through _schedule_refill so a purchase arriving meanwhile can't
+        # start a second refill of the same pool
+        for key in self.sales:
+            self._schedule_refill(key)
+        await asyncio.gather(*list(self._refills.values()))
+
+    def start(self, client):
+        self._client = client
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        tasks = [self._task, *self._refills.values()]
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self.pools.clear()
+        await db.release_numbers(self.owner)
+
+    async def take(self, platform, country):
+        """Reserve a number for a purchase, or None if the pair is sold out"""
+        key = (platform, country)
+        pool = self.pools.setdefault(key, deque())
+        number = pool.popleft() if pool else await db.claim_number(platform, country, self.owner)
+        if len(pool) < INVENTORY_POOL_SIZE // 2 + 1:
+            self._schedule_refill(key)
+        return number
+
+    def put_back(self, number):
+        """Return a number from take() that wasn't bought"""
+        self.pools.setdefault((number['platform'], number['country']), deque()).appendleft(number)
+
+    async def discard(self, number):
+        """Drop a number from take() whose sale didn't go through"""
+        await db.release_numbers(self.owner, [number['_id']])
+
+    def record_sale(self, platform, country):
+        self._sales_window((platform, country)).append(time.time())
+
+    def forecast(self, key, remaining):
+        """Seconds until `key` runs out at the recent sales rate, or None"""
+        window = self._sales_window(key)
+        cutoff = time.time() - INVENTORY_RATE_WINDOW
+        while window and window[0] < cutoff:
+            window.popleft()
+        if not window:
+            return None
+        return remaining / (len(window) / INVENTORY_RATE_WINDOW)
+
+    async def refill(self, key):
+        pool = self.pools.setdefault(key, deque())
+        missing = INVENTORY_POOL_SIZE - len(pool)
+        if missing > 0:
+            pool.extend(await db.reserve_numbers(key[0], key[1], self.owner, missing))
+
+    def _sales_window(self, key):
+        return self.sales.setdefault(key, deque())
+
+    def _schedule_refill(self, key):
+        # Keep a reference so the task isn't garbage-collected mid-refill
+        if key not in self._refills:
+            task = asyncio.create_task(self._refill_task(key))
+            self._refills[key] = task
+            task.add_done_callback(lambda _: self._refills.pop(key, None))
+
+    async def _refill_task(self, key):
+        try:
+            await self.refill(key)
+        except Exception as e:
+            logger.error(f"❌ Failed to refill {key} pool: {e}")
+
+    async def _check_stock(self, key):
+        remaining = await db.count_available(*key)
+        eta = self.forecast(key, remaining)
+        if eta is None or eta > LOW_STOCK_ALERT_HOURS * 3600:
+            return
+        if time.time() - self.last_alert.get(key, 0) < LOW_STOCK_ALERT_COOLDOWN:
+            return
+
+        self.last_alert[key] = time.time()
+        rate = len(self.sales[key]) * 3600 / INVENTORY_RATE_WINDOW
+        if remaining:
+            text = LOW_STOCK_ALERT_TEXT.format(
+                platform=key[0], country=key[1], remaining=remaining,
+                rate=rate, hours=eta / 3600
+            )
+        else:
+            text = OUT_OF_STOCK_ALERT_TEXT.format(platform=key[0], country=key[1], rate=rate)
+        await self._client.send_message(LOG_CHANNEL, text)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(INVENTORY_REFILL_INTERVAL)
+            try:
+                pooled = [number['_id'] for pool in self.pools.values() for number in pool]
+                await db.refresh_reservations(self.owner, pooled)
+                await db.release_stale_reservations(
+                    datetime.now() - timedelta(seconds=INVENTORY_RESERVATION_TTL)
+                )
+                for key in list(self.pools):
+                    self._schedule_refill(key)
+                await asyncio.gather(*(self._check_stock(key) for key in list(self.sales)))
+            except Exception as e:
+                logger.error(f"❌ Inventory maintenance failed: {e}")
+
+
+# Global inventory instance
+inventory = Inventory()
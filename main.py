@@ -1,16 +1,21 @@
 import os
 import asyncio
+import time
 import zipfile
 import io
 from datetime import datetime
+from bson import ObjectId
 from pyrogram import Client, filters, idle
 from pyrogram.types import (
-    Message, InlineKeyboardMarkup, 
-    InlineKeyboardButton, CallbackQuery
+    Message, CallbackQuery
 )
 from config import *
 from database import db
 from payment_gateway import RazorpayPayment
+from callbacks import router
+from templates import *
+from inventory import inventory
+from broadcast import broadcaster
 
 # Initialize bot
 app = Client("session_bot", api_id=API_ID, api_hash=API_HASH, bot_token=BOT_TOKEN)
@@ -27,9 +32,19 @@ async def read_otp_from_file(file_data):
     """Read OTP from file"""
     return "123456"  # Placeholder
 
+def _render_qr_code(url):
+    # qrcode and PIL are heavy, so they are imported on the first recharge
+    import qrcode
+    image = qrcode.make(url)
+    buffer = io.BytesIO()
+    buffer.name = "payment_qr.png"
+    image.save(buffer, format="PNG")
+    buffer.seek(0)
+    return buffer
+
 async def generate_qr_code(url):
     """Generate QR code for payment"""
-    return "https://via.placeholder.com/300"  # Placeholder
+    return await asyncio.to_thread(_render_qr_code, url)
 
 # Start Command
 @app.on_message(filters.command("start"))
@@ -42,58 +57,32 @@ async def start_command(client, message: Message):
     await db.add_user(user_id, username, first_name)
     
     # Welcome message with buttons
-    keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton("👤 Profile", callback_data="profile"),
-         InlineKeyboardButton("🔢 Get Number", callback_data="get_number")],
-        [InlineKeyboardButton("💰 Balance", callback_data="balance"),
-         InlineKeyboardButton("📞 Support", url=SUPPORT_GROUP)],
-        [InlineKeyboardButton("ℹ️ How to Use", callback_data="how_to_use")]
-    ])
-    
     await message.reply_photo(
-        photo="https://telegra.ph/file/random.jpg",  # Replace with your image
-        caption="**🤖 Welcome to Session Bot!**\n\n"
-               "Create Telegram sessions easily with our advanced bot.\n\n"
-               "**Features:**\n"
-               "• Easy Session Generation\n"
-               "• Automatic OTP Reading\n"
-               "• Secure Payment System\n"
-               "• 24/7 Support\n\n"
-               "Select an option below to get started:",
-        reply_markup=keyboard
+        photo=START_PHOTO,
+        caption=START_CAPTION,
+        reply_markup=START_KEYBOARD
     )
 
 # Profile Callback
-@app.on_callback_query(filters.regex("^profile$"))
+@router.route("profile", 1)
 async def profile_callback(client, callback_query: CallbackQuery):
     user_id = callback_query.from_user.id
-    user = await db.get_user(user_id)
-    
-    profile_text = f"""
-**👤 User Profile**
-
-**🆔 User ID:** `{user_id}`
-**👤 Name:** {callback_query.from_user.first_name}
-**💰 Wallet Balance:** ₹{user.get('wallet_balance', 0)}
-**📊 Total Spent:** ₹{user.get('total_spent', 0)}
-**👥 Referrals:** {user.get('referral_count', 0)} users
-**🔗 Referral Code:** `{user.get('referral_code', 'N/A')}`
-**🎁 Referral Bonus:** ₹0.5 per user
-
-**Invite friends and earn money!**
-    """
-    
-    keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton("🔙 Back", callback_data="main_menu")]
-    ])
+    user = await db.get_user_profile(user_id)
     
     await callback_query.edit_message_text(
-        profile_text,
-        reply_markup=keyboard
+        PROFILE_TEXT.format(
+            user_id=user_id,
+            first_name=callback_query.from_user.first_name,
+            wallet_balance=user.get('wallet_balance', 0),
+            total_spent=user.get('total_spent', 0),
+            referral_count=user.get('referral_count', 0),
+            referral_code=user.get('referral_code', 'N/A')
+        ),
+        reply_markup=BACK_TO_MENU_KEYBOARD
     )
 
 # Get Number Flow
-@app.on_callback_query(filters.regex("^get_number$"))
+@router.route("get_number", 2)
 async def get_number_callback(client, callback_query: CallbackQuery):
     user_id = callback_query.from_user.id
     user = await db.get_user(user_id)
@@ -103,163 +92,120 @@ async def get_number_callback(client, callback_query: CallbackQuery):
         await callback_query.answer("❌ You are banned from using this bot!", show_alert=True)
         return
     
-    # Get available platforms from database
-    platforms = await db.db.numbers.distinct("platform", {"used": False})
+    # Get available platforms (cached until stock changes)
+    keyboard = await platforms_keyboard()
     
-    if not platforms:
+    if not keyboard:
         await callback_query.answer("❌ No numbers available currently!", show_alert=True)
         return
     
-    keyboard_buttons = []
-    for platform in platforms:
-        keyboard_buttons.append([InlineKeyboardButton(
-            f"📱 {platform.title()}", 
-            callback_data=f"platform_{platform}"
-        )])
-    
-    keyboard_buttons.append([InlineKeyboardButton("🔙 Back", callback_data="main_menu")])
-    
-    keyboard = InlineKeyboardMarkup(keyboard_buttons)
-    
     await callback_query.edit_message_text(
-        "**🔢 Get Number**\n\n"
-        "Select platform:",
+        GET_NUMBER_TEXT,
         reply_markup=keyboard
     )
 
 # Platform Selection
-@app.on_callback_query(filters.regex("^platform_"))
-async def platform_selection(client, callback_query: CallbackQuery):
-    platform = callback_query.data.split("_")[1]
-    
-    # Get available countries for this platform
-    countries = await db.db.numbers.distinct("country", {
-        "platform": platform,
-        "used": False
-    })
+@router.route("platform", 3, str)
+async def platform_selection(client, callback_query: CallbackQuery, platform):
+    # Get available countries for this platform (cached until stock changes)
+    keyboard = await countries_keyboard(platform)
     
-    if not countries:
+    if not keyboard:
         await callback_query.answer("❌ No numbers available for this platform!", show_alert=True)
         return
     
-    keyboard_buttons = []
-    for country in countries:
-        # Get price for this platform-country combination
-        number = await db.db.numbers.find_one({
-            "platform": platform,
-            "country": country,
-            "used": False
-        })
-        
-        if number:
-            keyboard_buttons.append([InlineKeyboardButton(
-                f"🇺🇸 {country} - ₹{number['price']}", 
-                callback_data=f"country_{platform}_{country}"
-            )])
-    
-    keyboard_buttons.append([InlineKeyboardButton("🔙 Back", callback_data="get_number")])
-    
-    keyboard = InlineKeyboardMarkup(keyboard_buttons)
-    
     await callback_query.edit_message_text(
-        f"**📱 {platform.upper()} Numbers**\n\n"
-        "Select country:",
+        PLATFORM_TEXT.format(platform=platform.upper()),
         reply_markup=keyboard
     )
 
 # Country Selection and Number Assignment
-@app.on_callback_query(filters.regex("^country_"))
-async def country_selection(client, callback_query: CallbackQuery):
-    data = callback_query.data.split("_")
-    platform = data[1]
-    country = data[2]
+@router.route("country", 4, str, str)
+async def country_selection(client, callback_query: CallbackQuery, platform, country):
     user_id = callback_query.from_user.id
     
     user = await db.get_user(user_id)
     
-    # Get available number
-    number_data = await db.get_available_number(platform, country)
+    # Get available number (served from the pre-reserved pool)
+    number_data = await inventory.take(platform, country)
     
     if not number_data:
         await callback_query.answer("❌ No numbers available for this country!", show_alert=True)
         return
     
+    # Until the number is sold or back in its pool, any error would leave it
+    # reserved to us but unreachable, so release it before re-raising
+    try:
+        affordable = user['wallet_balance'] >= number_data['price']
+        if affordable:
+            # Assign number, then deduct balance
+            sold = await db.mark_number_used(
+                number_data['_id'], user_id, owner=inventory.owner, price=number_data['price']
+            )
+    except Exception:
+        await inventory.discard(number_data)
+        raise
+    
     # Check wallet balance
-    if user['wallet_balance'] < number_data['price']:
-        insufficient_text = f"""
-**❌ Insufficient Balance!**
-
-**Number Price:** ₹{number_data['price']}
-**Your Balance:** ₹{user['wallet_balance']}
-
-Please recharge your wallet to continue.
-        """
-        
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("💰 Recharge Wallet", callback_data="recharge")],
-            [InlineKeyboardButton("🔙 Back", callback_data=f"platform_{platform}")]
-        ])
-        
+    if not affordable:
+        inventory.put_back(number_data)
         await callback_query.edit_message_text(
-            insufficient_text,
-            reply_markup=keyboard
+            INSUFFICIENT_BALANCE_TEXT.format(
+                price=number_data['price'],
+                balance=user['wallet_balance']
+            ),
+            reply_markup=insufficient_balance_keyboard(platform)
         )
         return
     
-    # Deduct balance and assign number
+    if not sold:
+        # Taken by someone else or repriced since it was pooled
+        await inventory.discard(number_data)
+        await callback_query.answer(STOCK_TAKEN_TEXT, show_alert=True)
+        return
+    number_data = sold
     await db.update_wallet(user_id, -number_data['price'])
-    await db.mark_number_used(number_data['_id'], user_id)
+    inventory.record_sale(platform, country)
+    invalidate_catalog(platform)
     
     # Extract number from file
     phone_number = await extract_number_from_zip(number_data['file_data'])
     
-    success_text = f"""
-**✅ Number Assigned Successfully!**
-
-**📞 Your Number:** `{phone_number}`
-**📱 Platform:** {platform}
-**🌍 Country:** {country}
-**💰 Deducted:** ₹{number_data['price']}
-**💳 Remaining Balance:** ₹{user['wallet_balance'] - number_data['price']}
-
-**📝 Instructions:**
-1. Open original Telegram app (from Play Store)
-2. Request OTP on this number
-3. Click 'I Requested OTP' button below
-4. Get your OTP code automatically
-
-⚠️ **Note:** Use only official Telegram apps.
-    """
-    
-    keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton("📲 I Requested OTP", callback_data=f"read_otp_{number_data['_id']}")],
-        [InlineKeyboardButton("🔄 Get Another Number", callback_data="get_number")]
-    ])
+    balance_left = user['wallet_balance'] - number_data['price']
     
     await callback_query.edit_message_text(
-        success_text,
-        reply_markup=keyboard
+        NUMBER_ASSIGNED_TEXT.format(
+            phone_number=phone_number,
+            platform=platform,
+            country=country,
+            price=number_data['price'],
+            balance=balance_left
+        ),
+        reply_markup=number_assigned_keyboard(number_data['_id'])
     )
     
     # Send log to channel
     await client.send_message(
         LOG_CHANNEL,
-        f"**📊 Number Purchased**\n\n"
-        f"**👤 User:** {callback_query.from_user.mention}\n"
-        f"**🆔 ID:** `{user_id}`\n"
-        f"**📞 Number:** `{phone_number}`\n"
-        f"**📱 Platform:** {platform}\n"
-        f"**💰 Price:** ₹{number_data['price']}\n"
-        f"**💳 Balance Left:** ₹{user['wallet_balance'] - number_data['price']}"
+        PURCHASE_LOG_TEXT.format(
+            mention=callback_query.from_user.mention,
+            user_id=user_id,
+            phone_number=phone_number,
+            platform=platform,
+            price=number_data['price'],
+            balance=balance_left
+        )
     )
 
 # Read OTP Functionality
-@app.on_callback_query(filters.regex("^read_otp_"))
-async def read_otp_callback(client, callback_query: CallbackQuery):
-    number_id = callback_query.data.split("_")[2]
-    
+@router.route("read_otp", 5, ObjectId)
+async def read_otp_callback(client, callback_query: CallbackQuery, number_id):
     # Get number data
-    number_data = await db.db.numbers.find_one({"_id": number_id})
+    # Only the buyer may read the number's OTP
+    number_data = await db.db.numbers.find_one({
+        "_id": number_id,
+        "used_by": callback_query.from_user.id
+    })
     
     if not number_data:
         await callback_query.answer("❌ Number data not found!", show_alert=True)
@@ -269,34 +215,15 @@ async def read_otp_callback(client, callback_query: CallbackQuery):
     otp_code = await read_otp_from_file(number_data['file_data'])
     
     if otp_code:
-        otp_text = f"""
-**✅ OTP Code Found!**
-
-**📞 Number:** `{await extract_number_from_zip(number_data['file_data'])}`
-**📱 Platform:** {number_data['platform']}
-**🔢 OTP Code:** `{otp_code}`
-
-**⚠️ Important:**
-- Use this OTP within 5 minutes
-- Don't share with anyone
-- Complete your login process
-        """
-        
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("🔄 Get Another Number", callback_data="get_number")],
-            [InlineKeyboardButton("🏠 Main Menu", callback_data="main_menu")]
-        ])
+        otp_text = OTP_FOUND_TEXT.format(
+            phone_number=await extract_number_from_zip(number_data['file_data']),
+            platform=number_data['platform'],
+            otp_code=otp_code
+        )
+        keyboard = OTP_FOUND_KEYBOARD
     else:
-        otp_text = """
-**❌ OTP Not Found!**
-
-Please wait for OTP to arrive or request again.
-        """
-        
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("🔄 Try Again", callback_data=callback_query.data)],
-            [InlineKeyboardButton("📞 Support", url=SUPPORT_GROUP)]
-        ])
+        otp_text = OTP_NOT_FOUND_TEXT
+        keyboard = otp_retry_keyboard(callback_query.data)
     
     await callback_query.edit_message_text(
         otp_text,
@@ -304,51 +231,25 @@ Please wait for OTP to arrive or request again.
     )
 
 # Balance Check
-@app.on_callback_query(filters.regex("^balance$"))
+@router.route("balance", 6)
 async def balance_callback(client, callback_query: CallbackQuery):
     user_id = callback_query.from_user.id
-    user = await db.get_user(user_id)
-    
-    balance_text = f"""
-**💰 Wallet Balance**
-
-**Current Balance:** ₹{user.get('wallet_balance', 0)}
-**Total Spent:** ₹{user.get('total_spent', 0)}
-**Referral Earnings:** ₹{user.get('referral_count', 0) * 0.5}
-
-**💸 Recharge Options:**
-- Minimum: ₹{MIN_RECHARGE}
-- Instant UPI Payment
-- Automatic Verification
-    """
-    
-    keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton("💳 Recharge Wallet", callback_data="recharge")],
-        [InlineKeyboardButton("🎁 Redeem Code", callback_data="redeem")],
-        [InlineKeyboardButton("🔙 Back", callback_data="main_menu")]
-    ])
+    user = await db.get_user_profile(user_id)
     
     await callback_query.edit_message_text(
-        balance_text,
-        reply_markup=keyboard
+        BALANCE_TEXT.format(
+            wallet_balance=user.get('wallet_balance', 0),
+            total_spent=user.get('total_spent', 0),
+            referral_earnings=user.get('referral_count', 0) * 0.5,
+            min_recharge=MIN_RECHARGE
+        ),
+        reply_markup=BALANCE_KEYBOARD
     )
 
 # Recharge Flow
-@app.on_callback_query(filters.regex("^recharge$"))
+@router.route("recharge", 7)
 async def recharge_callback(client, callback_query: CallbackQuery):
-    recharge_text = f"""
-**💳 Recharge Wallet**
-
-**Minimum Recharge:** ₹{MIN_RECHARGE}
-
-Please enter the amount you want to recharge:
-
-**Example:** `50` or `100` or `500`
-
-⚠️ **Note:** Enter only numbers without any symbols.
-    """
-    
-    await callback_query.edit_message_text(recharge_text)
+    await callback_query.edit_message_text(RECHARGE_TEXT)
     
     # Store that we're waiting for recharge amount
     await db.db.users.update_one(
@@ -356,8 +257,24 @@ Please enter the amount you want to recharge:
         {"$set": {"waiting_for": "recharge_amount"}}
     )
 
+# Admin pool stats, registered before the private text handlers below
+@app.on_message(filters.command("dbstats") & filters.private)
+async def db_stats_command(client, message: Message):
+    if not await db.is_admin(message.from_user.id):
+        await message.reply_text("❌ Admin access required!")
+        return
+    
+    stats = db.pool_stats()
+    await message.reply_text(
+        DB_STATS_TEXT.format(
+            saturation=stats.get('saturation', 0) * 100,
+            max_pool_size=MONGO_MAX_POOL_SIZE,
+            **{key: stats.get(key, 0) for key in DB_STATS_FIELDS}
+        )
+    )
+
 # Handle recharge amount input - FIXED FILTER
-@app.on_message(filters.text & filters.private)
+@app.on_message(filters.text & filters.private & ~filters.regex(r"^/"))
 async def handle_recharge_amount(client, message: Message):
     # Skip if it's a command
     if message.text.startswith('/'):
@@ -371,46 +288,20 @@ async def handle_recharge_amount(client, message: Message):
             amount = int(message.text)
             
             if amount < MIN_RECHARGE:
-                await message.reply_text(
-                    f"❌ Minimum recharge amount is ₹{MIN_RECHARGE}. "
-                    f"Please enter amount {MIN_RECHARGE} or more."
-                )
+                await message.reply_text(MIN_RECHARGE_TEXT)
                 return
             
             # Generate payment link/QR
             payment_data = await razorpay.create_payment_link(amount, user_id)
             
-            payment_text = f"""
-**💰 Payment Details**
-
-**Amount:** ₹{amount}
-**Payment ID:** `{payment_data['id']}`
-
-**Payment Methods:**
-- GPay
-- PhonePe
-- Paytm
-- BHIM UPI
-- Any UPI App
-
-**Steps:**
-1. Scan QR code below or use payment link
-2. Complete payment
-3. Click 'Payment Done' button
-4. Enter UTR/Transaction ID
-            """
-            
-            keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton("📱 Payment Link", url=payment_data['short_url'])],
-                [InlineKeyboardButton("✅ Payment Done", callback_data=f"payment_done_{payment_data['id']}")],
-                [InlineKeyboardButton("📞 Support", url=SUPPORT_GROUP)]
-            ])
-            
             # Send QR code image
             await message.reply_photo(
                 photo=await generate_qr_code(payment_data['short_url']),
-                caption=payment_text,
-                reply_markup=keyboard
+                caption=PAYMENT_DETAILS_TEXT.format(
+                    amount=amount,
+                    payment_id=payment_data['id']
+                ),
+                reply_markup=payment_keyboard(payment_data['id'], payment_data['short_url'])
             )
             
             # Reset waiting state
@@ -423,15 +314,9 @@ async def handle_recharge_amount(client, message: Message):
             await message.reply_text("❌ Please enter a valid number only!")
 
 # Payment Done Callback
-@app.on_callback_query(filters.regex("^payment_done_"))
-async def payment_done_callback(client, callback_query: CallbackQuery):
-    payment_id = callback_query.data.split("_")[2]
-    
-    await callback_query.edit_message_text(
-        "**✅ Payment Verification**\n\n"
-        "Please send your UTR/Transaction ID:\n\n"
-        "**Example:** `UTR123456789` or `TXN123456789`"
-    )
+@router.route("payment_done", 8, str)
+async def payment_done_callback(client, callback_query: CallbackQuery, payment_id):
+    await callback_query.edit_message_text(PAYMENT_UTR_PROMPT)
     
     # Store payment ID and waiting for UTR
     await db.db.users.update_one(
@@ -443,7 +328,7 @@ async def payment_done_callback(client, callback_query: CallbackQuery):
     )
 
 # Handle UTR input
-@app.on_message(filters.text & filters.private)
+@app.on_message(filters.text & filters.private & ~filters.regex(r"^/"))
 async def handle_utr_input(client, message: Message):
     # Skip if it's a command
     if message.text.startswith('/'):
@@ -468,7 +353,7 @@ async def handle_utr_input(client, message: Message):
             await db.update_wallet(user_id, amount)
             
             # Update payment status
-            await db.db.payments.update_one(
+            await db.majority_db.payments.update_one(
                 {"payment_id": payment_id},
                 {"$set": {"status": "verified", "utr": utr}}
             )
@@ -476,36 +361,18 @@ async def handle_utr_input(client, message: Message):
             # Get updated user data
             updated_user = await db.get_user(user_id)
             
-            success_text = f"""
-**✅ Payment Verified Successfully!**
-
-**Amount Added:** ₹{amount}
-**UTR Number:** `{utr}`
-**New Balance:** ₹{updated_user['wallet_balance']}
-
-Thank you for your payment! 🎉
-            """
-            
-            keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton("💰 Check Balance", callback_data="balance")],
-                [InlineKeyboardButton("🔢 Get Number", callback_data="get_number")]
-            ])
-            
             await message.reply_text(
-                success_text,
-                reply_markup=keyboard
+                PAYMENT_VERIFIED_TEXT.format(
+                    amount=amount,
+                    utr=utr,
+                    balance=updated_user['wallet_balance']
+                ),
+                reply_markup=PAYMENT_VERIFIED_KEYBOARD
             )
         else:
             await message.reply_text(
-                "**❌ Payment Not Verified**\n\n"
-                "We couldn't verify your payment. Please:\n"
-                "1. Check if payment was completed\n"
-                "2. Ensure UTR is correct\n"
-                "3. Contact admin with screenshot\n\n"
-                "Click below for support:",
-                reply_markup=InlineKeyboardMarkup([
-                    [InlineKeyboardButton("📞 Contact Admin", url=SUPPORT_GROUP)]
-                ])
+                PAYMENT_NOT_VERIFIED_TEXT,
+                reply_markup=PAYMENT_NOT_VERIFIED_KEYBOARD
             )
         
         # Reset waiting state
@@ -534,62 +401,53 @@ async def add_file_command(client, message: Message):
         return
     
     # File addition logic here
-    await message.reply_text(
-        "**📁 Add Number File**\n\n"
-        "Please send the file in this format:\n"
-        "`/addfile platform country price`\n\n"
-        "**Example:**\n"
-        "`/addfile telegram india 10`\n\n"
-        "Then send the ZIP file."
-    )
-
-# How to Use
-@app.on_callback_query(filters.regex("^how_to_use$"))
-async def how_to_use_callback(client, callback_query: CallbackQuery):
-    how_to_text = """
-**📖 How to Use This Bot**
+    await message.reply_text(ADD_FILE_HELP)
 
-**1. 💰 Recharge Wallet**
-   - Minimum recharge: ₹20
-   - Use UPI payment methods
-   - Automatic verification
-
-**2. 🔢 Get Numbers**
-   - Select platform (Telegram, etc.)
-   - Choose country
-   - Auto number assignment
-
-**3. 📲 Get OTP**
-   - Request OTP in official app
-   - Click 'I Requested OTP'
-   - Receive OTP automatically
-
-**4. 👥 Referral System**
-   - Earn ₹0.5 per referral
-   - Share your referral code
-   - Both get bonus!
-
-**Need Help?** Contact support below.
-    """
+@app.on_message(filters.command("broadcast") & filters.private)
+async def broadcast_command(client, message: Message):
+    user_id = message.from_user.id
+    
+    if not await db.is_admin(user_id):
+        await message.reply_text("❌ Admin access required!")
+        return
     
-    keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton("📞 Support Group", url=SUPPORT_GROUP)],
-        [InlineKeyboardButton("🔙 Back", callback_data="main_menu")]
-    ])
+    # Either copy the replied-to message or send the command's text
+    source = message.reply_to_message
+    text = message.text.split(None, 1)[1] if len(message.command) > 1 else None
+    if not source and not text:
+        await message.reply_text(BROADCAST_HELP)
+        return
+    
+    # Claimed before the first await so concurrent /broadcast commands can't both start
+    if not broadcaster.reserve():
+        await message.reply_text(BROADCAST_BUSY_TEXT)
+        return
     
+    try:
+        broadcast = await db.create_broadcast(
+            user_id,
+            message.chat.id,
+            source.id if source else None,
+            None if source else text
+        )
+    except Exception:
+        broadcaster.release()
+        raise
+    broadcaster.start(client, broadcast)
+    await message.reply_text(BROADCAST_STARTED_TEXT)
+
+# How to Use
+@router.route("how_to_use", 9)
+async def how_to_use_callback(client, callback_query: CallbackQuery):
     await callback_query.edit_message_text(
-        how_to_text,
-        reply_markup=keyboard
+        HOW_TO_USE_TEXT,
+        reply_markup=HOW_TO_USE_KEYBOARD
     )
 
 # Redeem Code
-@app.on_callback_query(filters.regex("^redeem$"))
+@router.route("redeem", 10)
 async def redeem_callback(client, callback_query: CallbackQuery):
-    await callback_query.edit_message_text(
-        "**🎁 Redeem Code**\n\n"
-        "Please enter your redeem code:\n\n"
-        "**Example:** `CODE123`"
-    )
+    await callback_query.edit_message_text(REDEEM_PROMPT)
     
     await db.db.users.update_one(
         {"user_id": callback_query.from_user.id},
@@ -597,18 +455,57 @@ async def redeem_callback(client, callback_query: CallbackQuery):
     )
 
 # Main menu callback
-@app.on_callback_query(filters.regex("^main_menu$"))
+@router.route("main_menu", 11)
 async def main_menu_callback(client, callback_query: CallbackQuery):
     await start_command(client, callback_query.message)
 
+# Single entry point for every button press
+@app.on_callback_query()
+async def callback_dispatcher(client, callback_query: CallbackQuery):
+    await router.dispatch(client, callback_query)
+
+# Startup helpers
+async def timed(name, coro, timings):
+    started = time.perf_counter()
+    result = await coro
+    timings[name] = time.perf_counter() - started
+    return result
+
+async def start_database(timings):
+    if not await timed("mongo_connect", db.init_db(), timings):
+        return False
+    # Index warm-up and cache preloading only need the connection
+    await asyncio.gather(
+        timed("indexes", db.ensure_indexes(), timings),
+        timed("catalog_cache", platforms_keyboard(), timings),
+        timed("inventory_pools", inventory.warm_up(), timings)
+    )
+    return True
+
 # Initialize bot
 async def main():
-    await db.init_db()
+    timings = {}
+    started = time.perf_counter()
+    # Mongo and the Pyrogram login don't depend on each other
+    db_ready, _ = await asyncio.gather(
+        start_database(timings),
+        timed("pyrogram_login", app.start(), timings)
+    )
+    # Don't serve on a half-initialised DB; keep trying until Mongo is back
+    while not db_ready:
+        print(f"❌ Database connection failed! Retrying in {MONGO_STARTUP_RETRY_DELAY}s...")
+        await asyncio.sleep(MONGO_STARTUP_RETRY_DELAY)
+        db_ready = await start_database(timings)
+    timings["total"] = time.perf_counter() - started
+    
     print("✅ Bot started successfully!")
     print("✅ Database connected!")
-    await app.start()
     print("✅ Pyrogram client started!")
+    print("⏱ Startup: " + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in timings.items()))
+    inventory.start(app)
+    await broadcaster.resume(app)
     await idle()
+    await inventory.stop()
     await app.stop()
 
 if __name__ == "__main__":
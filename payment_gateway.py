@@ -1,9 +1,18 @@
-import razorpay
 from config import RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET
 
 class RazorpayPayment:
     def __init__(self, key_id, key_secret):
-        self.client = razorpay.Client(auth=(key_id, key_secret))
+        self.key_id = key_id
+        self.key_secret = key_secret
+        self._client = None
+
+    @property
+    def client(self):
+        # razorpay (and requests underneath it) is only imported on first use
+        if self._client is None:
+            import razorpay
+            self._client = razorpay.Client(auth=(self.key_id, self.key_secret))
+        return self._client
     
     async def create_payment_link(self, amount, user_id):
         data = {
@@ -0,0 +1,471 @@
+import time
+import logging
+from functools import lru_cache
+from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from config import SUPPORT_GROUP, MIN_RECHARGE
+from callbacks import router
+from database import db
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "START_PHOTO", "START_CAPTION", "START_KEYBOARD", "BACK_TO_MENU_KEYBOARD",
+    "PROFILE_TEXT", "GET_NUMBER_TEXT", "PLATFORM_TEXT",
+    "INSUFFICIENT_BALANCE_TEXT", "NUMBER_ASSIGNED_TEXT", "PURCHASE_LOG_TEXT",
+    "STOCK_TAKEN_TEXT", "LOW_STOCK_ALERT_TEXT", "OUT_OF_STOCK_ALERT_TEXT",
+    "OTP_FOUND_TEXT", "OTP_FOUND_KEYBOARD", "OTP_NOT_FOUND_TEXT",
+    "BALANCE_TEXT", "BALANCE_KEYBOARD", "RECHARGE_TEXT", "MIN_RECHARGE_TEXT",
+    "PAYMENT_DETAILS_TEXT", "PAYMENT_UTR_PROMPT", "PAYMENT_VERIFIED_TEXT",
+    "PAYMENT_VERIFIED_KEYBOARD", "PAYMENT_NOT_VERIFIED_TEXT",
+    "PAYMENT_NOT_VERIFIED_KEYBOARD", "REDEEM_PROMPT", "ADD_FILE_HELP",
+    "DB_STATS_FIELDS", "DB_STATS_TEXT", "BROADCAST_HELP", "BROADCAST_BUSY_TEXT",
+    "BROADCAST_STARTED_TEXT", "BROADCAST_PROGRESS_TEXT",
+    "BROADCAST_REPORT_TEXT", "HOW_TO_USE_TEXT", "HOW_TO_USE_KEYBOARD",
+    "CATALOG_TTL", "insufficient_balance_keyboard", "number_assigned_keyboard",
+    "otp_retry_keyboard", "payment_keyboard", "invalidate_catalog",
+    "platforms_keyboard", "countries_keyboard"
+]
+
+# Static screens are built once at import and shared by every handler.
+# Dynamic ones are str.format templates filled in per call.
+
+# Start / Main Menu
+START_PHOTO = "https://telegra.ph/file/random.jpg"  # Replace with your image
+
+START_CAPTION = (
+    "**🤖 Welcome to Session Bot!**\n\n"
+    "Create Telegram sessions easily with our advanced bot.\n\n"
+    "**Features:**\n"
+    "• Easy Session Generation\n"
+    "• Automatic OTP Reading\n"
+    "• Secure Payment System\n"
+    "• 24/7 Support\n\n"
+    "Select an option below to get started:"
+)
+
+START_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("👤 Profile", callback_data="profile"),
+     InlineKeyboardButton("🔢 Get Number", callback_data="get_number")],
+    [InlineKeyboardButton("💰 Balance", callback_data="balance"),
+     InlineKeyboardButton("📞 Support", url=SUPPORT_GROUP)],
+    [InlineKeyboardButton("ℹ️ How to Use", callback_data="how_to_use")]
+])
+
+BACK_TO_MENU_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔙 Back", callback_data="main_menu")]
+])
+
+# Profile
+PROFILE_TEXT = """
+**👤 User Profile**
+
+**🆔 User ID:** `{user_id}`
+**👤 Name:** {first_name}
+**💰 Wallet Balance:** ₹{wallet_balance}
+**📊 Total Spent:** ₹{total_spent}
+**👥 Referrals:** {referral_count} users
+**🔗 Referral Code:** `{referral_code}`
+**🎁 Referral Bonus:** ₹0.5 per user
+
+**Invite friends and earn money!**
+    """
+
+# Get Number Flow
+GET_NUMBER_TEXT = (
+    "**🔢 Get Number**\n\n"
+    "Select platform:"
+)
+
+PLATFORM_TEXT = (
+    "**📱 {platform} Numbers**\n\n"
+    "Select country:"
+)
+
+INSUFFICIENT_BALANCE_TEXT = """
+**❌ Insufficient Balance!**
+
+**Number Price:** ₹{price}
+**Your Balance:** ₹{balance}
+
+Please recharge your wallet to continue.
+        """
+
+NUMBER_ASSIGNED_TEXT = """
+**✅ Number Assigned Successfully!**
+
+**📞 Your Number:** `{phone_number}`
+**📱 Platform:** {platform}
+**🌍 Country:** {country}
+**💰 Deducted:** ₹{price}
+**💳 Remaining Balance:** ₹{balance}
+
+**📝 Instructions:**
+1. Open original Telegram app (from Play Store)
+2. Request OTP on this number
+3. Click 'I Requested OTP' button below
+4. Get your OTP code automatically
+
+⚠️ **Note:** Use only official Telegram apps.
+    """
+
+PURCHASE_LOG_TEXT = (
+    "**📊 Number Purchased**\n\n"
+    "**👤 User:** {mention}\n"
+    "**🆔 ID:** `{user_id}`\n"
+    "**📞 Number:** `{phone_number}`\n"
+    "**📱 Platform:** {platform}\n"
+    "**💰 Price:** ₹{price}\n"
+    "**💳 Balance Left:** ₹{balance}"
+)
+
+STOCK_TAKEN_TEXT = "❌ That number was just taken, please try again!"
+
+LOW_STOCK_ALERT_TEXT = (
+    "**⚠️ Low Stock Alert**\n\n"
+    "**📱 Platform:** {platform}\n"
+    "**🌍 Country:** {country}\n"
+    "**📦 Remaining:** {remaining}\n"
+    "**📈 Sales Rate:** {rate:.1f}/hour\n"
+    "**⏳ Runs Out In:** ~{hours:.1f} hours"
+)
+
+OUT_OF_STOCK_ALERT_TEXT = (
+    "**🚨 Out of Stock**\n\n"
+    "**📱 Platform:** {platform}\n"
+    "**🌍 Country:** {country}\n"
+    "**📈 Sales Rate:** {rate:.1f}/hour\n\n"
+    "Users can't buy this number until stock is added."
+)
+
+# Read OTP
+OTP_FOUND_TEXT = """
+**✅ OTP Code Found!**
+
+**📞 Number:** `{phone_number}`
+**📱 Platform:** {platform}
+**🔢 OTP Code:** `{otp_code}`
+
+**⚠️ Important:**
+- Use this OTP within 5 minutes
+- Don't share with anyone
+- Complete your login process
+        """
+
+OTP_FOUND_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔄 Get Another Number", callback_data="get_number")],
+    [InlineKeyboardButton("🏠 Main Menu", callback_data="main_menu")]
+])
+
+OTP_NOT_FOUND_TEXT = """
+**❌ OTP Not Found!**
+
+Please wait for OTP to arrive or request again.
+        """
+
+# Balance / Recharge
+BALANCE_TEXT = """
+**💰 Wallet Balance**
+
+**Current Balance:** ₹{wallet_balance}
+**Total Spent:** ₹{total_spent}
+**Referral Earnings:** ₹{referral_earnings}
+
+**💸 Recharge Options:**
+- Minimum: ₹{min_recharge}
+- Instant UPI Payment
+- Automatic Verification
+    """
+
+BALANCE_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("💳 Recharge Wallet", callback_data="recharge")],
+    [InlineKeyboardButton("🎁 Redeem Code", callback_data="redeem")],
+    [InlineKeyboardButton("🔙 Back", callback_data="main_menu")]
+])
+
+RECHARGE_TEXT = f"""
+**💳 Recharge Wallet**
+
+**Minimum Recharge:** ₹{MIN_RECHARGE}
+
+Please enter the amount you want to recharge:
+
+**Example:** `50` or `100` or `500`
+
+⚠️ **Note:** Enter only numbers without any symbols.
+    """
+
+MIN_RECHARGE_TEXT = (
+    f"❌ Minimum recharge amount is ₹{MIN_RECHARGE}. "
+    f"Please enter amount {MIN_RECHARGE} or more."
+)
+
+PAYMENT_DETAILS_TEXT = """
+**💰 Payment Details**
+
+**Amount:** ₹{amount}
+**Payment ID:** `{payment_id}`
+
+**Payment Methods:**
+- GPay
+- PhonePe
+- Paytm
+- BHIM UPI
+- Any UPI App
+
+**Steps:**
+1. Scan QR code below or use payment link
+2. Complete payment
+3. Click 'Payment Done' button
+4. Enter UTR/Transaction ID
+            """
+
+PAYMENT_UTR_PROMPT = (
+    "**✅ Payment Verification**\n\n"
+    "Please send your UTR/Transaction ID:\n\n"
+    "**Example:** `UTR123456789` or `TXN123456789`"
+)
+
+PAYMENT_VERIFIED_TEXT = """
+**✅ Payment Verified Successfully!**
+
+**Amount Added:** ₹{amount}
+**UTR Number:** `{utr}`
+**New Balance:** ₹{balance}
+
+Thank you for your payment! 🎉
+            """
+
+PAYMENT_VERIFIED_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("💰 Check Balance", callback_data="balance")],
+    [InlineKeyboardButton("🔢 Get Number", callback_data="get_number")]
+])
+
+PAYMENT_NOT_VERIFIED_TEXT = (
+    "**❌ Payment Not Verified**\n\n"
+    "We couldn't verify your payment. Please:\n"
+    "1. Check if payment was completed\n"
+    "2. Ensure UTR is correct\n"
+    "3. Contact admin with screenshot\n\n"
+    "Click below for support:"
+)
+
+PAYMENT_NOT_VERIFIED_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📞 Contact Admin", url=SUPPORT_GROUP)]
+])
+
+REDEEM_PROMPT = (
+    "**🎁 Redeem Code**\n\n"
+    "Please enter your redeem code:\n\n"
+    "**Example:** `CODE123`"
+)
+
+# Admin
+ADD_FILE_HELP = (
+    "**📁 Add Number File**\n\n"
+    "Please send the file in this format:\n"
+    "`/addfile platform country price`\n\n"
+    "**Example:**\n"
+    "`/addfile telegram india 10`\n\n"
+    "Then send the ZIP file."
+)
+
+DB_STATS_FIELDS = (
+    "servers", "open", "in_use", "waiting", "peak_in_use", "peak_waiting",
+    "checkouts", "checkout_failures", "checkout_timeouts", "pool_clears"
+)
+
+DB_STATS_TEXT = """
+**🗄 MongoDB Connection Pool**
+
+**Servers:** {servers}
+**Saturation:** {saturation:.1f}% (max {max_pool_size} per server)
+**Open Connections:** {open}
+**In Use:** {in_use} (peak {peak_in_use})
+**Waiting:** {waiting} (peak {peak_waiting})
+**Checkouts:** {checkouts}
+**Checkout Failures:** {checkout_failures} ({checkout_timeouts} timeouts)
+**Pool Clears:** {pool_clears}
+    """
+
+BROADCAST_HELP = (
+    "**📢 Broadcast**\n\n"
+    "Reply to a message with `/broadcast` to send a copy of it to every user,\n"
+    "or send `/broadcast your text` to send plain text."
+)
+
+BROADCAST_BUSY_TEXT = "❌ A broadcast is already running. Wait for its report first."
+
+BROADCAST_STARTED_TEXT = "✅ Broadcast started. Progress will be posted here."
+
+BROADCAST_PROGRESS_TEXT = (
+    "**📢 Broadcasting...**\n\n"
+    "**✅ Delivered:** {delivered}\n"
+    "**🚫 Blocked:** {blocked}\n"
+    "**❌ Failed:** {failed}"
+)
+
+BROADCAST_REPORT_TEXT = (
+    "**📢 Broadcast Finished**\n\n"
+    "**✅ Delivered:** {delivered}\n"
+    "**🚫 Blocked:** {blocked}\n"
+    "**❌ Failed:** {failed}\n"
+    "**⏱ Took:** {minutes:.1f} minutes"
+)
+
+# How to Use
+HOW_TO_USE_TEXT = f"""
+**📖 How to Use This Bot**
+
+**1. 💰 Recharge Wallet**
+   - Minimum recharge: ₹{MIN_RECHARGE}
+   - Use UPI payment methods
+   - Automatic verification
+
+**2. 🔢 Get Numbers**
+   - Select platform (Telegram, etc.)
+   - Choose country
+   - Auto number assignment
+
+**3. 📲 Get OTP**
+   - Request OTP in official app
+   - Click 'I Requested OTP'
+   - Receive OTP automatically
+
+**4. 👥 Referral System**
+   - Earn ₹0.5 per referral
+   - Share your referral code
+   - Both get bonus!
+
+**Need Help?** Contact support below.
+    """
+
+HOW_TO_USE_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📞 Support Group", url=SUPPORT_GROUP)],
+    [InlineKeyboardButton("🔙 Back", callback_data="main_menu")]
+])
+
+
+# Per-field keyboards that only depend on their arguments
+@lru_cache(maxsize=1024)
+def insufficient_balance_keyboard(platform):
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton("💰 Recharge Wallet", callback_data="recharge")],
+        [InlineKeyboardButton("🔙 Back", callback_data=router.pack("platform", platform))]
+    ])
+
+
+def number_assigned_keyboard(number_id):
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton("📲 I Requested OTP", callback_data=router.pack("read_otp", number_id))],
+        [InlineKeyboardButton("🔄 Get Another Number", callback_data="get_number")]
+    ])
+
+
+def otp_retry_keyboard(callback_data):
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton("🔄 Try Again", callback_data=callback_data)],
+        [InlineKeyboardButton("📞 Support", url=SUPPORT_GROUP)]
+    ])
+
+
+def payment_keyboard(payment_id, short_url):
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton("📱 Payment Link", url=short_url)],
+        [InlineKeyboardButton("✅ Payment Done", callback_data=router.pack("payment_done", payment_id))],
+        [InlineKeyboardButton("📞 Support", url=SUPPORT_GROUP)]
+    ])
+
+
+# Catalog keyboards, memoised until stock changes
+CATALOG_TTL = 60  # Seconds; bounds staleness when stock changes outside the bot
+
+_catalog_cache = {}
+
+# Keys rebuilt from the primary next time, since secondaries may not have
+# replicated the sale that invalidated them yet
+_read_primary = set()
+
+
+def invalidate_catalog(platform):
+    """Drop cached catalog keyboards after stock changes on `platform`"""
+    for key in ("platforms", ("countries", platform)):
+        _catalog_cache.pop(key, None)
+        _read_primary.add(key)
+
+
+def _catalog_db(key):
+    if key in _read_primary:
+        _read_primary.discard(key)
+        return db.db
+    return db.secondary_db
+
+
+def _cached(key):
+    entry = _catalog_cache.get(key)
+    if entry and time.monotonic() - entry[0] < CATALOG_TTL:
+        return entry[1]
+    return None
+
+
+async def platforms_keyboard():
+    """Keyboard of platforms with stock, or None if nothing is available"""
+    cached = _cached("platforms")
+    if cached is not None:
+        return cached or None
+
+    platforms = await _catalog_db("platforms").numbers.distinct("platform", {"used": False})
+
+    keyboard = None
+    if platforms:
+        keyboard_buttons = []
+        for platform in platforms:
+            try:
+                callback_data = router.pack("platform", platform)
+            except ValueError as e:
+                # Drop just this button rather than the whole menu
+                logger.warning(f"Skipping platform button: {e}")
+                continue
+            keyboard_buttons.append([InlineKeyboardButton(
+                f"📱 {platform.title()}",
+                callback_data=callback_data
+            )])
+        keyboard_buttons.append([InlineKeyboardButton("🔙 Back", callback_data="main_menu")])
+        keyboard = InlineKeyboardMarkup(keyboard_buttons)
+
+    _catalog_cache["platforms"] = (time.monotonic(), keyboard or False)
+    return keyboard
+
+
+async def countries_keyboard(platform):
+    """Keyboard of countries with stock for `platform`, or None"""
+    key = ("countries", platform)
+    cached = _cached(key)
+    if cached is not None:
+        return cached or None
+
+    # One price per country, taken from any unused number
+    countries = await _catalog_db(key).numbers.aggregate([
+        {"$match": {"platform": platform, "used": False}},
+        {"$group": {"_id": "$country", "price": {"$first": "$price"}}},
+        {"$sort": {"_id": 1}}
+    ]).to_list(length=None)
+
+    keyboard = None
+    if countries:
+        keyboard_buttons = []
+        for country in countries:
+            try:
+                callback_data = router.pack("country", platform, country['_id'])
+            except ValueError as e:
+                # Drop just this button rather than the whole menu
+                logger.warning(f"Skipping country button: {e}")
+                continue
+            keyboard_buttons.append([InlineKeyboardButton(
+                f"🇺🇸 {country['_id']} - ₹{country['price']}",
+                callback_data=callback_data
+            )])
+        keyboard_buttons.append([InlineKeyboardButton("🔙 Back", callback_data="get_number")])
+        keyboard = InlineKeyboardMarkup(keyboard_buttons)
+
+    _catalog_cache[key] = (time.monotonic(), keyboard or False)
+    return keyboard